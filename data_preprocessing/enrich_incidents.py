@@ -9,6 +9,8 @@ from datetime import datetime
 from typing import Dict, Any, Optional, Tuple
 from collections import defaultdict
 
+from incident_rollups import rollup_path_for, build_rollups, save_rollups
+
 def load_ml_model(model_path='model.pkl', encoder_path='label_encoder.pkl'):
     try:
         with open(model_path, 'rb') as f:
@@ -328,6 +330,10 @@ def main(input_file='incidents.json', output_file='incidents_enriched.json'):
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(enriched_incidents, f, indent=2, ensure_ascii=False)
     
+    rollup_file = rollup_path_for(output_file)
+    save_rollups(build_rollups(enriched_incidents), rollup_file)
+    print(f"✓ Rebuilt rollups in {rollup_file}")
+    
     stats = collect_statistics(enriched_incidents)
     
     print(f"\n{'=' * 60}")
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+On-disk feature store for incident texts.
+
+Sparse feature matrices are computed once per incident and cached as
+memory-mapped CSR arrays (data.npy, indices.npy, indptr.npy) in append-only
+segments. Rows are keyed by incident id and a hash of the text, and each
+featurizer version gets its own directory, so retraining or re-evaluating over
+the full history skips tokenization and vectorization entirely.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import pickle
+import hashlib
+import argparse
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+STORE_FORMAT = 2
+DEFAULT_ROOT = 'feature_cache'
+
+
+def incident_text(incident: Dict[str, Any]) -> str:
+    """Text passed to predict_proba by enrich_incidents.py and the prediction service (not lowercased)."""
+    return f"{incident.get('title', '')} {incident.get('description', '')}"
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+class ModelFeaturizer:
+    """Reuses every fitted step before the classifier in the routing pipeline in model.pkl.
+
+    Cached matrices can be fed straight into the pipeline's final estimator via
+    `predict_proba`, skipping the text steps.
+    """
+
+    def __init__(self, model_path: str = 'model.pkl'):
+        with open(model_path, 'rb') as f:
+            self.model = pickle.load(f)
+        self.featurizer = self.model[:-1]
+        self.classifier = self.model[-1]
+        digest = hashlib.sha1(pickle.dumps(self.featurizer)).hexdigest()[:12]
+        self.version = f"tfidf-{digest}"
+
+    def transform(self, texts: List[str]) -> sp.csr_matrix:
+        return sp.csr_matrix(self.featurizer.transform(texts), dtype=np.float64)
+
+    def predict_proba(self, features: sp.csr_matrix) -> np.ndarray:
+        return self.classifier.predict_proba(features)
+
+
+class HashingFeaturizer:
+    """Stateless hashed n-gram features for training new classifiers from scratch."""
+
+    def __init__(self, n_features: int = 2 ** 20, ngram_range: Tuple[int, int] = (1, 2),
+                 stop_words: Optional[str] = 'english', alternate_sign: bool = False):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features,
+            ngram_range=ngram_range,
+            stop_words=stop_words,
+            alternate_sign=alternate_sign,
+        )
+        self.version = (f"hashing-{n_features}-ngram{ngram_range[0]}-{ngram_range[1]}"
+                        f"-stop_{stop_words or 'none'}-sign_{int(alternate_sign)}")
+
+    def transform(self, texts: List[str]) -> sp.csr_matrix:
+        return sp.csr_matrix(self.vectorizer.transform(texts), dtype=np.float64)
+
+
+class FeatureStore:
+    """Append-only store of CSR segments under one featurizer version directory.
+
+    Each cache miss writes a new segment (data/indices/indptr .npy plus its
+    row keys) and a small manifest naming the segments, so adding a handful of
+    incidents costs I/O proportional to those incidents, not the history.
+    Rows superseded by edited texts stay on disk until compact() rewrites the
+    live rows into a single segment.
+    """
+
+    def __init__(self, featurizer, root: str = DEFAULT_ROOT,
+                 text_fn: Callable[[Dict[str, Any]], str] = incident_text):
+        self.featurizer = featurizer
+        self.text_fn = text_fn
+        self.path = os.path.join(root, featurizer.version)
+        self.segments: List[str] = []
+        self.matrices: List[sp.csr_matrix] = []
+        self.index: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self.latest_segment: Dict[str, int] = {}
+        self._load()
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, 'manifest.json')
+
+    def _load(self) -> None:
+        self.segments, self.matrices, self.index, self.latest_segment = [], [], {}, {}
+        if not os.path.exists(self._manifest_path()):
+            return
+        with open(self._manifest_path(), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format') != STORE_FORMAT:
+            print(f"⚠ Ignoring feature cache format {manifest.get('format')} at {self.path}")
+            return
+
+        for segment in manifest['segments']:
+            self._attach(segment['name'], tuple(segment['shape']))
+
+    def _attach(self, name: str, shape: Tuple[int, int]) -> None:
+        seg_path = os.path.join(self.path, name)
+        arrays = [np.load(os.path.join(seg_path, f"{array}.npy"), mmap_mode='r')
+                  for array in ('data', 'indices', 'indptr')]
+        with open(os.path.join(seg_path, 'rows.json'), 'r', encoding='utf-8') as f:
+            keys = json.load(f)
+
+        seg_no = len(self.segments)
+        self.segments.append(name)
+        self.matrices.append(sp.csr_matrix(tuple(arrays), shape=shape, copy=False))
+        for row, key in enumerate(keys):
+            # Later segments win, so a re-vectorized key shadows its older row
+            self.index[tuple(key)] = (seg_no, row)
+            self.latest_segment[key[0]] = seg_no
+
+    def _write_manifest(self, segments: List[Dict[str, Any]]) -> None:
+        tmp_path = f"{self._manifest_path()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'format': STORE_FORMAT, 'featurizer': self.featurizer.version, 'segments': segments}, f)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _segment_entries(self) -> List[Dict[str, Any]]:
+        return [{'name': name, 'shape': list(matrix.shape)} for name, matrix in zip(self.segments, self.matrices)]
+
+    def _write_segment(self, matrix: sp.csr_matrix, keys: List[List[str]]) -> str:
+        name = f"seg-{time.time_ns():x}-{os.getpid()}"
+        seg_path = os.path.join(self.path, name)
+        os.makedirs(seg_path)
+        for array in ('data', 'indices', 'indptr'):
+            np.save(os.path.join(seg_path, f"{array}.npy"), np.asarray(getattr(matrix, array)))
+        with open(os.path.join(seg_path, 'rows.json'), 'w', encoding='utf-8') as f:
+            json.dump(keys, f)
+        return name
+
+    def features(self, incidents: List[Dict[str, Any]]) -> sp.csr_matrix:
+        """Return a CSR matrix with one row per incident, in the given order.
+
+        Only incidents that are new or whose text changed are vectorized, and
+        they are appended as one new segment. When the request covers a
+        single-segment store in stored order, the memory-mapped matrix is
+        returned without copying.
+        """
+        wanted = []
+        texts = {}
+        for inc in incidents:
+            text = self.text_fn(inc)
+            digest = text_hash(text)
+            key = (inc.get('id') or f"text-{digest}", digest)
+            wanted.append(key)
+            texts[key] = text
+
+        missing = [key for key in texts if key not in self.index]
+        if missing:
+            self._append([list(key) for key in missing], [texts[key] for key in missing])
+
+        if not wanted:
+            return sp.csr_matrix((0, self.matrices[0].shape[1] if self.matrices else 0))
+
+        locations = [self.index[key] for key in wanted]
+        if len(self.matrices) == 1 and len(locations) == self.matrices[0].shape[0] \
+                and all(row == pos for pos, (_, row) in enumerate(locations)):
+            return self.matrices[0]
+        return self._gather(locations)
+
+    def _gather(self, locations: List[Tuple[int, int]]) -> sp.csr_matrix:
+        """Collect (segment, row) locations into one CSR matrix, preserving their order."""
+        pieces, order = [], []
+        for seg_no, matrix in enumerate(self.matrices):
+            picked = [(pos, row) for pos, (seg, row) in enumerate(locations) if seg == seg_no]
+            if picked:
+                order.extend(pos for pos, _ in picked)
+                pieces.append(matrix[np.fromiter((row for _, row in picked), dtype=np.int64, count=len(picked))])
+        stacked = sp.vstack(pieces, format='csr')
+        return stacked[np.argsort(np.asarray(order))]
+
+    def _append(self, keys: List[List[str]], texts: List[str]) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        matrix = self.featurizer.transform(texts)
+        name = self._write_segment(matrix, keys)
+        self._write_manifest(self._segment_entries() + [{'name': name, 'shape': list(matrix.shape)}])
+        print(f"✓ Vectorized {len(keys)} incidents into {self.path}/{name}", file=sys.stderr)
+        self._load()
+
+    def compact(self) -> None:
+        """Rewrite live rows into a single segment and delete the old ones.
+
+        A row is superseded when its incident id was re-vectorized (new text)
+        in a later segment.
+        """
+        live = {key: loc for key, loc in self.index.items() if loc[0] == self.latest_segment[key[0]]}
+        if len(self.segments) <= 1 and len(live) == sum(m.shape[0] for m in self.matrices):
+            return
+        keys = [list(key) for key in live]
+        matrix = self._gather(list(live.values()))
+        old_segments = list(self.segments)
+        name = self._write_segment(matrix, keys)
+        self._write_manifest([{'name': name, 'shape': list(matrix.shape)}])
+        self._load()
+        for old in old_segments:
+            shutil.rmtree(os.path.join(self.path, old), ignore_errors=True)
+        print(f"✓ Compacted {len(old_segments)} segments into {name} ({len(keys)} rows)", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incident feature store')
+    parser.add_argument('--input', type=str, default='incidents.json', help='Incidents JSON')
+    parser.add_argument('--featurizer', choices=['model', 'hashing'], default='model', help='Feature extractor')
+    parser.add_argument('--root', type=str, default=DEFAULT_ROOT, help='Cache directory')
+    parser.add_argument('--evaluate', action='store_true', help='Score cached features with model.pkl against assignedTo')
+    parser.add_argument('--compact', action='store_true', help='Merge segments and drop superseded rows')
+
+    args = parser.parse_args()
+    featurizer = ModelFeaturizer() if args.featurizer == 'model' else HashingFeaturizer()
+    store = FeatureStore(featurizer, args.root)
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        incidents = json.load(f)
+
+    features = store.features(incidents)
+    if args.compact:
+        store.compact()
+        features = store.features(incidents)
+    print(f"✓ {features.shape[0]} x {features.shape[1]} features ({features.nnz} non-zeros) from {store.path}")
+
+    if args.evaluate:
+        if not isinstance(featurizer, ModelFeaturizer):
+            parser.error('--evaluate requires --featurizer model')
+        with open('label_encoder.pkl', 'rb') as f:
+            encoder = pickle.load(f)
+        probas = featurizer.predict_proba(features)
+        predicted = encoder.classes_[np.argmax(probas, axis=1)]
+        labels = np.array([inc.get('assignedTo', '') for inc in incidents])
+        labeled = labels != ''
+        accuracy = float(np.mean(predicted[labeled] == labels[labeled])) if labeled.any() else 0.0
+        print(f"✓ Accuracy vs assignedTo: {accuracy:.3f} over {int(labeled.sum())} labeled incidents")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Materialized, time-bucketed rollups of enriched incidents.
+
+Incidents are aggregated by createdAt into hour and day buckets, each holding
+counts by team, category, priority, status and SLA status plus confidence sums.
+Dashboard stats for any time range are served by merging buckets instead of
+rescanning every incident.
+"""
+
+import os
+import json
+import hashlib
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Iterable
+
+ROLLUP_VERSION = 3
+
+GRANULARITIES = {
+    'hour': '%Y-%m-%dT%H',
+    'day': '%Y-%m-%d',
+}
+
+DIMENSIONS = {
+    'byTeam': lambda inc: inc.get('assignedTo'),
+    'byCategory': lambda inc: inc.get('category'),
+    'byPriority': lambda inc: inc.get('priority'),
+    'bySeverity': lambda inc: inc.get('status'),
+    'bySlaStatus': lambda inc: (inc.get('context') or {}).get('slaStatus'),
+}
+
+
+def rollup_path_for(output_file: str) -> str:
+    """Return the rollup artifact path that sits next to an enriched output file."""
+    base, _ = os.path.splitext(output_file)
+    return f"{base}_rollups.json"
+
+
+def parse_created_at(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO timestamp into a naive UTC datetime (Z or explicit offsets allowed)."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().rstrip('Z'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def empty_rollups() -> Dict[str, Any]:
+    return {
+        'version': ROLLUP_VERSION,
+        'updatedAt': None,
+        'incidents': {},
+        'buckets': {granularity: {} for granularity in GRANULARITIES},
+    }
+
+
+def empty_bucket() -> Dict[str, Any]:
+    bucket = {'total': 0, 'atRisk': 0, 'confidenceSum': 0.0, 'confidenceCount': 0, 'teamConfidence': {}}
+    bucket.update({dimension: {} for dimension in DIMENSIONS})
+    return bucket
+
+
+def incident_key(incident: Dict[str, Any]) -> Optional[str]:
+    """Ledger key: the id plus a hash of the title, since truncated ids can collide."""
+    if not incident.get('id'):
+        return None
+    digest = hashlib.sha1(incident.get('title', '').encode('utf-8')).hexdigest()[:8]
+    return f"{incident['id']}:{digest}"
+
+
+def contribution(incident: Dict[str, Any], hour: str) -> List[Any]:
+    """Compact record of what one incident adds to its buckets, so it can be subtracted later."""
+    confidence = (incident.get('routingReasoning') or {}).get('confidence')
+    if not isinstance(confidence, (int, float)):
+        confidence = None
+    return [hour] + [key_fn(incident) or 'unknown' for key_fn in DIMENSIONS.values()] + [confidence]
+
+
+def apply_contribution(bucket: Dict[str, Any], contrib: List[Any], sign: int) -> None:
+    dims = dict(zip(DIMENSIONS, contrib[1:-1]))
+    confidence = contrib[-1]
+
+    bucket['total'] += sign
+    for dimension, key in dims.items():
+        count = bucket[dimension].get(key, 0) + sign
+        if count:
+            bucket[dimension][key] = count
+        else:
+            bucket[dimension].pop(key, None)
+
+    if dims['bySlaStatus'] == 'At risk':
+        bucket['atRisk'] += sign
+
+    if confidence is not None:
+        bucket['confidenceSum'] += sign * confidence
+        bucket['confidenceCount'] += sign
+        team_conf = bucket['teamConfidence'].setdefault(dims['byTeam'], {'sum': 0.0, 'count': 0})
+        team_conf['sum'] += sign * confidence
+        team_conf['count'] += sign
+        if not team_conf['count']:
+            del bucket['teamConfidence'][dims['byTeam']]
+
+
+def merge_bucket(target: Dict[str, Any], source: Dict[str, Any]) -> None:
+    for key in ('total', 'atRisk', 'confidenceSum', 'confidenceCount'):
+        target[key] += source.get(key, 0)
+
+    for dimension in DIMENSIONS:
+        for key, count in source.get(dimension, {}).items():
+            target[dimension][key] = target[dimension].get(key, 0) + count
+
+    for team, conf in source.get('teamConfidence', {}).items():
+        team_conf = target['teamConfidence'].setdefault(team, {'sum': 0.0, 'count': 0})
+        team_conf['sum'] += conf['sum']
+        team_conf['count'] += conf['count']
+
+
+def _apply_to_buckets(rollups: Dict[str, Any], contrib: List[Any], sign: int) -> None:
+    hour = contrib[0]
+    for granularity, key in (('hour', hour), ('day', hour[:10])):
+        buckets = rollups['buckets'][granularity]
+        bucket = buckets.setdefault(key, empty_bucket())
+        apply_contribution(bucket, contrib, sign)
+        if not bucket['total']:
+            del buckets[key]
+
+
+def update_rollups(rollups: Dict[str, Any], incidents: Iterable[Dict[str, Any]]) -> int:
+    """Fold incidents into the rollups in place; safe to repeat or overlap.
+
+    Each incident's contribution is kept in a ledger keyed by incident_key, so
+    an incident seen again has its previous contribution subtracted before the
+    new one is added. Returns the number of new or changed incidents.
+    """
+    ledger = rollups['incidents']
+    changed = 0
+
+    for inc in incidents:
+        created = parse_created_at(inc.get('createdAt'))
+        key = incident_key(inc)
+        if not created or not key:
+            continue
+
+        contrib = contribution(inc, created.strftime(GRANULARITIES['hour']))
+        previous = ledger.get(key)
+        if previous == contrib:
+            continue
+        if previous:
+            _apply_to_buckets(rollups, previous, -1)
+        _apply_to_buckets(rollups, contrib, 1)
+        ledger[key] = contrib
+        changed += 1
+
+    if changed:
+        rollups['updatedAt'] = datetime.now().isoformat() + 'Z'
+    return changed
+
+
+def build_rollups(incidents: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    rollups = empty_rollups()
+    update_rollups(rollups, incidents)
+    return rollups
+
+
+def load_rollups(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return empty_rollups()
+    with open(path, 'r', encoding='utf-8') as f:
+        rollups = json.load(f)
+    if rollups.get('version') != ROLLUP_VERSION:
+        print(f"⚠ Ignoring rollups with version {rollups.get('version')}, rebuilding")
+        return empty_rollups()
+    return rollups
+
+
+def save_rollups(rollups: Dict[str, Any], path: str) -> None:
+    for buckets in rollups['buckets'].values():
+        for bucket in buckets.values():
+            bucket['confidenceSum'] = round(bucket['confidenceSum'], 4)
+            for conf in bucket['teamConfidence'].values():
+                conf['sum'] = round(conf['sum'], 4)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(rollups, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def select_bucket_keys(start: datetime, end: datetime) -> List[tuple]:
+    """Cover start..end with whole days where possible and hours at the edges.
+
+    Buckets are hourly at the finest, so start is floored to its hour and a
+    partial final hour is included whole.
+    """
+    keys = []
+    cursor = start.replace(minute=0, second=0, microsecond=0)
+
+    while cursor < end:
+        day_end = cursor + timedelta(days=1)
+        if cursor.hour == 0 and cursor >= start and day_end <= end:
+            keys.append(('day', cursor.strftime(GRANULARITIES['day'])))
+            cursor = day_end
+        else:
+            keys.append(('hour', cursor.strftime(GRANULARITIES['hour'])))
+            cursor += timedelta(hours=1)
+
+    return keys
+
+
+def query_stats(rollups: Dict[str, Any], start: Optional[datetime] = None,
+                end: Optional[datetime] = None) -> Dict[str, Any]:
+    """Merge buckets covering start..end into a /stats-shaped summary (hour granularity)."""
+    merged = empty_bucket()
+    day_buckets = rollups['buckets']['day']
+
+    if start is None and end is None:
+        for bucket in day_buckets.values():
+            merge_bucket(merged, bucket)
+    else:
+        if start is None or end is None:
+            known = sorted(day_buckets)
+            if not known:
+                return summarize(merged)
+            start = start or datetime.strptime(known[0], GRANULARITIES['day'])
+            end = end or datetime.strptime(known[-1], GRANULARITIES['day']) + timedelta(days=1)
+        for granularity, key in select_bucket_keys(start, end):
+            bucket = rollups['buckets'][granularity].get(key)
+            if bucket:
+                merge_bucket(merged, bucket)
+
+    return summarize(merged)
+
+
+def summarize(bucket: Dict[str, Any]) -> Dict[str, Any]:
+    stats = {
+        'total': bucket['total'],
+        'critical': 0, 'high': 0, 'medium': 0, 'low': 0,
+        # Same definition as the backend /stats route: unscored incidents count as 0
+        'avgConfidence': bucket['confidenceSum'] / bucket['total'] if bucket['total'] else 0,
+        'atRisk': bucket['atRisk'],
+    }
+    stats.update(bucket['bySeverity'])
+    for dimension in DIMENSIONS:
+        stats[dimension] = dict(sorted(bucket[dimension].items(), key=lambda x: x[1], reverse=True))
+    stats['avgConfidenceByTeam'] = {
+        team: round(bucket['teamConfidence'].get(team, {'sum': 0.0})['sum'] / count, 3)
+        for team, count in bucket['byTeam'].items() if count
+    }
+    return stats
+
+
+def iso_timestamp(value: str) -> datetime:
+    parsed = parse_created_at(value)
+    if parsed is None:
+        raise argparse.ArgumentTypeError(f"invalid ISO timestamp: {value!r}")
+    return parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incident rollups')
+    parser.add_argument('--input', type=str, default='incidents_enriched.json', help='Enriched incidents JSON')
+    parser.add_argument('--rollups', type=str, help='Rollup artifact (defaults to next to --input)')
+    parser.add_argument('--append', action='store_true', help='Fold --input into existing rollups (repeated or re-enriched incidents replace their old counts)')
+    parser.add_argument('--start', type=iso_timestamp, help='Query range start (ISO timestamp, floored to the hour)')
+    parser.add_argument('--end', type=iso_timestamp, help='Query range end (ISO timestamp, rounded up to the hour)')
+    parser.add_argument('--query', action='store_true', help='Print stats for the range instead of updating')
+
+    args = parser.parse_args()
+    rollup_file = args.rollups or rollup_path_for(args.input)
+
+    if args.query:
+        stats = query_stats(load_rollups(rollup_file), args.start, args.end)
+        print(json.dumps(stats, indent=2))
+        return
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        incidents = json.load(f)
+
+    rollups = load_rollups(rollup_file) if args.append else empty_rollups()
+    added = update_rollups(rollups, incidents)
+    save_rollups(rollups, rollup_file)
+    print(f"✓ Rolled up {added} new or changed incidents into {rollup_file}")
+
+
+if __name__ == '__main__':
+    main()
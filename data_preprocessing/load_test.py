@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Load generator for the ML prediction service.
+
+Replays incident texts from incidents.json against `ml_prediction_service.py --serve`
+in closed-loop (fixed concurrency) or open-loop (fixed arrival rate) steps and
+reports throughput, latency percentiles, error/fallback rates and server CPU/RSS
+as JSON.
+"""
+
+import os
+import sys
+import math
+import json
+import time
+import random
+import argparse
+import threading
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def load_payloads(path: str) -> List[Dict[str, Any]]:
+    """Build /predict request bodies from incidents, as the backend would send them."""
+    with open(path, 'r', encoding='utf-8') as f:
+        incidents = json.load(f)
+
+    payloads = []
+    for inc in incidents:
+        text = f"{inc.get('title', '')} {inc.get('description', '')}".strip()
+        if not text:
+            continue
+        payload = {'text': text}
+        if inc.get('affectedServices'):
+            payload['workload'] = inc['affectedServices'][0]
+        if inc.get('routingReasoning', {}).get('primaryReason'):
+            payload['monitor'] = inc['routingReasoning']['primaryReason']
+        payloads.append(payload)
+    return payloads
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    # Nearest-rank: the smallest value with at least pct% of samples at or below it
+    idx = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[idx]
+
+
+class ProcessSampler:
+    """Samples CPU time and RSS of the server process from /proc (Linux only)."""
+
+    def __init__(self, pid: Optional[int]):
+        self.pid = pid
+
+    def cpu_seconds(self) -> Optional[float]:
+        if not self.pid:
+            return None
+        try:
+            with open(f'/proc/{self.pid}/stat', 'r') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def rss_mb(self) -> Optional[float]:
+        if not self.pid:
+            return None
+        try:
+            with open(f'/proc/{self.pid}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return round(int(line.split()[1]) / 1024, 1)
+        except (OSError, ValueError):
+            pass
+        return None
+
+
+class LoadGenerator:
+    def __init__(self, url: str, payloads: List[Dict[str, Any]], timeout: float = 10.0, seed: int = 42):
+        self.url = url
+        self.payloads = payloads
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def next_payload(self) -> bytes:
+        with self.lock:
+            payload = self.rng.choice(self.payloads)
+        return json.dumps(payload).encode('utf-8')
+
+    def send(self, body: bytes) -> Dict[str, Any]:
+        req = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                result = json.loads(resp.read())
+            return {'ok': True, 'fallback': result.get('method') != 'ml_model'}
+        except Exception as e:
+            return {'ok': False, 'fallback': False, 'error': type(e).__name__}
+
+    def run_closed_loop(self, concurrency: int, duration: float) -> List[Dict[str, Any]]:
+        """Each worker issues its next request as soon as the previous one returns."""
+        results = []
+        deadline = time.perf_counter() + duration
+
+        def worker():
+            local = []
+            while time.perf_counter() < deadline:
+                body = self.next_payload()
+                start = time.perf_counter()
+                outcome = self.send(body)
+                outcome['latency'] = time.perf_counter() - start
+                local.append(outcome)
+            with self.lock:
+                results.extend(local)
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def run_open_loop(self, rate: float, duration: float, max_in_flight: int) -> Tuple[List[Dict[str, Any]], float]:
+        """Requests arrive on a Poisson schedule regardless of how fast the server answers.
+
+        Latency is measured from the scheduled arrival time, so queueing delay
+        on the client side is not hidden (no coordinated omission). Returns the
+        results and the length of the arrival window; any time after it is
+        spent draining requests still in flight.
+        """
+        results = []
+
+        def fire(scheduled: float, body: bytes):
+            outcome = self.send(body)
+            outcome['latency'] = time.perf_counter() - scheduled
+            with self.lock:
+                results.append(outcome)
+
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            start = time.perf_counter()
+            scheduled = start
+            while scheduled < start + duration:
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(fire, scheduled, self.next_payload())
+                scheduled += self.rng.expovariate(rate)
+            arrival_seconds = time.perf_counter() - start
+        return results, arrival_seconds
+
+
+def summarize_step(results: List[Dict[str, Any]], elapsed: float, sampler: ProcessSampler,
+                   cpu_before: Optional[float], cpu_after: Optional[float]) -> Dict[str, Any]:
+    ok = [r for r in results if r['ok']]
+    latencies = sorted(r['latency'] * 1000 for r in ok)
+    errors = {}
+    for r in results:
+        if not r['ok']:
+            errors[r['error']] = errors.get(r['error'], 0) + 1
+
+    def ms(value):
+        return round(value, 2) if value is not None else None
+
+    cpu_pct = None
+    if cpu_before is not None and cpu_after is not None and elapsed > 0:
+        cpu_pct = round(100 * (cpu_after - cpu_before) / elapsed, 1)
+
+    return {
+        'requests': len(results),
+        'elapsedSeconds': round(elapsed, 3),
+        'throughputRps': round(len(ok) / elapsed, 2) if elapsed > 0 else 0,
+        'latencyMs': {
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'max': ms(latencies[-1] if latencies else None),
+        },
+        'errorRate': round(1 - len(ok) / len(results), 4) if results else 0,
+        'errors': errors,
+        'fallbackRate': round(sum(r['fallback'] for r in ok) / len(ok), 4) if ok else 0,
+        'server': {'cpuPercent': cpu_pct, 'rssMb': sampler.rss_mb()},
+    }
+
+
+def start_server(port: int, startup_timeout: float) -> subprocess.Popen:
+    cmd = [sys.executable, os.path.join(SCRIPT_DIR, 'ml_prediction_service.py'), '--serve', '--port', str(port)]
+    proc = subprocess.Popen(cmd, cwd=SCRIPT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    probe = LoadGenerator(f'http://127.0.0.1:{port}/predict', [{'text': 'warmup'}], timeout=1.0)
+    deadline = time.time() + startup_timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited with code {proc.returncode}")
+        if probe.send(probe.next_payload())['ok']:
+            return proc
+        time.sleep(0.2)
+
+    stop_server(proc)
+    raise RuntimeError(f"Server did not become ready within {startup_timeout}s")
+
+
+def stop_server(proc: subprocess.Popen, timeout: float = 10.0) -> None:
+    """Terminate and reap the server, killing it if it ignores SIGTERM."""
+    proc.terminate()
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def parse_steps(value: str) -> List[float]:
+    return [float(v) for v in value.split(',') if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the ML prediction service')
+    parser.add_argument('--mode', choices=['closed', 'open'], default='closed', help='Closed-loop (concurrency) or open-loop (arrival rate)')
+    parser.add_argument('--concurrency', type=str, default='1,2,4,8,16', help='Closed-loop concurrency steps')
+    parser.add_argument('--rates', type=str, default='5,10,20,50,100', help='Open-loop request rates (req/s)')
+    parser.add_argument('--max-in-flight', type=int, default=256, help='Open-loop client thread cap')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per step')
+    parser.add_argument('--warmup', type=int, default=20, help='Warm-up requests before the first step')
+    parser.add_argument('--incidents', type=str, default=os.path.join(SCRIPT_DIR, 'incidents.json'), help='Incident texts to replay')
+    parser.add_argument('--url', type=str, help='Target an already running server instead of starting one')
+    parser.add_argument('--server-pid', type=int, help='PID to sample CPU/RSS from when using --url')
+    parser.add_argument('--port', type=int, default=5055, help='Port for the locally started server')
+    parser.add_argument('--startup-timeout', type=float, default=60.0, help='Seconds to wait for the server to start')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Per-request timeout in seconds')
+    parser.add_argument('--output', type=str, help='Write the JSON report here instead of stdout')
+
+    args = parser.parse_args()
+    payloads = load_payloads(args.incidents)
+
+    server = None
+    if args.url:
+        url, pid = args.url, args.server_pid
+    else:
+        server = start_server(args.port, args.startup_timeout)
+        url, pid = f'http://127.0.0.1:{args.port}/predict', server.pid
+
+    sampler = ProcessSampler(pid)
+    generator = LoadGenerator(url, payloads, timeout=args.timeout)
+    report = {
+        'target': url,
+        'mode': args.mode,
+        'durationPerStep': args.duration,
+        'payloads': len(payloads),
+        'cpuCount': os.cpu_count(),
+        'steps': [],
+    }
+
+    try:
+        for _ in range(args.warmup):
+            generator.send(generator.next_payload())
+        report['idleRssMb'] = sampler.rss_mb()
+
+        steps = parse_steps(args.concurrency if args.mode == 'closed' else args.rates)
+        for step in steps:
+            cpu_before = sampler.cpu_seconds()
+            start = time.perf_counter()
+            if args.mode == 'closed':
+                results = generator.run_closed_loop(int(step), args.duration)
+            else:
+                results, arrival_seconds = generator.run_open_loop(step, args.duration, args.max_in_flight)
+            elapsed = time.perf_counter() - start
+            summary = summarize_step(results, elapsed, sampler, cpu_before, sampler.cpu_seconds())
+            if args.mode == 'closed':
+                summary['concurrency'] = int(step)
+            else:
+                # throughputRps spans arrivals plus the drain; offeredRps covers arrivals only
+                summary['targetRps'] = step
+                summary['offeredRps'] = round(len(results) / arrival_seconds, 2) if arrival_seconds > 0 else 0
+                summary['arrivalSeconds'] = round(arrival_seconds, 3)
+                summary['drainSeconds'] = round(elapsed - arrival_seconds, 3)
+            report['steps'].append(summary)
+            print(f"  {args.mode} step {step:g}: {summary['throughputRps']} req/s, "
+                  f"p99 {summary['latencyMs']['p99']} ms", file=sys.stderr)
+    finally:
+        if server:
+            stop_server(server)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,18 @@
 #!/usr/bin/env python3
 """ML prediction service for escalation routing."""
 
+import os
 import pickle
 import json
 import sys
+import time
+import signal
+import hmac
+import hashlib
 import argparse
-from typing import Dict, Any, Optional
+import threading
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional
 
 try:
     import sklearn
@@ -15,55 +22,193 @@ except ImportError:
     print("Warning: scikit-learn not available", file=sys.stderr)
 
 
+RELOAD_SWAPPED = 'swapped'
+RELOAD_FAILED = 'failed'
+RELOAD_BUSY = 'busy'
+
+
+class LoadedModel:
+    """An immutable model/encoder pair; swapped in as a whole on reload."""
+    
+    def __init__(self, model=None, label_encoder=None, version: Optional[str] = None,
+                 loaded_at: Optional[str] = None, load_seconds: Optional[float] = None):
+        self.model = model
+        self.label_encoder = label_encoder
+        self.version = version
+        self.loaded_at = loaded_at
+        self.load_seconds = load_seconds
+
+
 class MLPredictionService:
+    WARMUP_TEXT = 'warmup: sql database dtu spike on exchange mailbox'
+    
     def __init__(self, model_path='model.pkl', encoder_path='label_encoder.pkl'):
-        self.model = None
-        self.label_encoder = None
+        self.model_path = model_path
+        self.encoder_path = encoder_path
+        self._active = LoadedModel()
+        self._reload_lock = threading.Lock()
+        self.last_reload_error = None
         
         if not ML_AVAILABLE:
             return
         
         try:
-            with open(model_path, 'rb') as f:
-                self.model = pickle.load(f)
-            with open(encoder_path, 'rb') as f:
-                self.label_encoder = pickle.load(f)
-            print(f"✓ Loaded ML model", file=sys.stderr)
+            self._active = self._load()
+            print(f"✓ Loaded ML model {self._active.version}", file=sys.stderr)
         except Exception as e:
             print(f"Error loading model: {e}", file=sys.stderr)
-            self.model = None
+    
+    @property
+    def model(self):
+        return self._active.model
+    
+    @property
+    def label_encoder(self):
+        return self._active.label_encoder
+    
+    def _artifact_signature(self):
+        return tuple((os.stat(p).st_mtime_ns, os.stat(p).st_size) for p in (self.model_path, self.encoder_path))
+    
+    def _load(self) -> LoadedModel:
+        """Load, validate and warm up the artifacts without touching the active model."""
+        start = time.perf_counter()
+        with open(self.model_path, 'rb') as f:
+            model_bytes = f.read()
+        with open(self.encoder_path, 'rb') as f:
+            encoder_bytes = f.read()
+        model = pickle.loads(model_bytes)
+        label_encoder = pickle.loads(encoder_bytes)
+        
+        probas = model.predict_proba([self.WARMUP_TEXT])
+        if probas.shape[1] != len(label_encoder.classes_):
+            raise ValueError(f"model has {probas.shape[1]} classes but encoder has {len(label_encoder.classes_)}")
+        
+        return LoadedModel(
+            model, label_encoder,
+            version=hashlib.sha1(model_bytes + encoder_bytes).hexdigest()[:12],
+            loaded_at=datetime.now().isoformat() + 'Z',
+            load_seconds=round(time.perf_counter() - start, 3),
+        )
+    
+    def reload(self) -> str:
+        """Load new artifacts and swap them in atomically; keep serving the old model on failure.
+        
+        Returns RELOAD_SWAPPED, RELOAD_FAILED, or RELOAD_BUSY when another
+        reload was already running and nothing was attempted.
+        """
+        if not ML_AVAILABLE:
+            return RELOAD_FAILED
+        if not self._reload_lock.acquire(blocking=False):
+            return RELOAD_BUSY
+        try:
+            return self._reload_locked()
+        finally:
+            self._reload_lock.release()
+    
+    def _reload_locked(self) -> str:
+        try:
+            loaded = self._load()
+        except Exception as e:
+            self.last_reload_error = f"{type(e).__name__}: {e}"
+            print(f"Error reloading model, keeping {self._active.version}: {e}", file=sys.stderr)
+            return RELOAD_FAILED
+        
+        previous = self._active.version
+        self._active = loaded
+        self.last_reload_error = None
+        print(f"✓ Swapped model {previous} -> {loaded.version} ({loaded.load_seconds}s)", file=sys.stderr)
+        return RELOAD_SWAPPED
+    
+    def reload_in_background(self) -> bool:
+        """Start a reload thread unless one is already running; returns whether one was scheduled."""
+        if not ML_AVAILABLE or not self._reload_lock.acquire(blocking=False):
+            return False
+        
+        def run():
+            try:
+                self._reload_locked()
+            finally:
+                self._reload_lock.release()
+        
+        threading.Thread(target=run, name='model-reload', daemon=True).start()
+        return True
+    
+    def watch_artifacts(self, interval: float = 5.0) -> threading.Thread:
+        """Poll the artifact files and reload once a change has settled for one interval."""
+        def watch():
+            try:
+                current = self._artifact_signature()
+            except OSError:
+                current = None
+            pending = None
+            
+            while True:
+                time.sleep(interval)
+                try:
+                    signature = self._artifact_signature()
+                except OSError:
+                    continue
+                if signature == current:
+                    pending = None
+                elif signature == pending:
+                    # If another reload holds the lock, keep the change pending and retry next tick
+                    if self.reload() != RELOAD_BUSY:
+                        current, pending = signature, None
+                else:
+                    pending = signature
+        
+        thread = threading.Thread(target=watch, name='model-watch', daemon=True)
+        thread.start()
+        return thread
+    
+    def status(self) -> Dict[str, Any]:
+        active = self._active
+        return {
+            'version': active.version,
+            'method': 'ml_model' if active.model else 'heuristic',
+            'loadedAt': active.loaded_at,
+            'loadSeconds': active.load_seconds,
+            'reloading': self._reload_lock.locked(),
+            'lastReloadError': self.last_reload_error,
+        }
     
     def predict(self, text: str, workload: Optional[str] = None, 
                 monitor: Optional[str] = None) -> Dict[str, Any]:
-        if not self.model or not self.label_encoder:
-            return self._heuristic_prediction(text, workload)
+        return self.predict_batch([text], [workload], [monitor])[0]
+    
+    def predict_batch(self, texts: List[str], workloads: Optional[List[Optional[str]]] = None,
+                      monitors: Optional[List[Optional[str]]] = None) -> List[Dict[str, Any]]:
+        workloads = workloads or [None] * len(texts)
+        # One snapshot per batch, so a concurrent swap never mixes model and encoder
+        active = self._active
+        
+        if not active.model or not active.label_encoder:
+            return [self._heuristic_prediction(t, w) for t, w in zip(texts, workloads)]
         
         try:
             import numpy as np
-            probas = self.model.predict_proba([text])[0]
-            predicted_idx = np.argmax(probas)
-            predicted_team = self.label_encoder.classes_[predicted_idx]
-            confidence = float(probas[predicted_idx])
-            
-            # Get top 3 alternatives
-            top_indices = np.argsort(probas)[-3:][::-1]
-            alternatives = [
-                {
-                    'team': self.label_encoder.classes_[idx],
-                    'confidence': round(float(probas[idx]), 3)
-                }
-                for idx in top_indices[1:]  # Skip the first one (it's the prediction)
-            ]
+            probas = active.model.predict_proba(texts)
+            predicted_idx = np.argmax(probas, axis=1)
+            # Top 3 per row, best first; the first one is the prediction itself
+            top_indices = np.argsort(probas, axis=1)[:, -3:][:, ::-1]
+            classes = active.label_encoder.classes_
             
-            return {
-                'team': predicted_team,
-                'confidence': round(confidence, 2),
-                'method': 'ml_model',
-                'alternatives': alternatives
-            }
+            results = []
+            for row, idx, top in zip(probas, predicted_idx, top_indices):
+                alternatives = [
+                    {'team': classes[alt], 'confidence': round(float(row[alt]), 3)}
+                    for alt in top[1:]
+                ]
+                results.append({
+                    'team': classes[idx],
+                    'confidence': round(float(row[idx]), 2),
+                    'method': 'ml_model',
+                    'alternatives': alternatives
+                })
+            return results
         except Exception as e:
             print(f"Prediction error: {e}", file=sys.stderr)
-            return self._heuristic_prediction(text, workload)
+            return [self._heuristic_prediction(t, w) for t, w in zip(texts, workloads)]
     
     def _heuristic_prediction(self, text: str, workload: Optional[str]) -> Dict[str, Any]:
         text_lower = text.lower()
@@ -91,6 +236,137 @@ class MLPredictionService:
         return {'team': 'ECCLSPassiveMonitorTraining', 'confidence': 0.75, 'method': 'default', 'alternatives': []}
 
 
+def read_records(path: str, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Stream records with text/workload/monitor fields from NDJSON or CSV ('-' for stdin)."""
+    import csv
+    
+    if fmt is None:
+        fmt = 'csv' if path.lower().endswith('.csv') else 'ndjson'
+    
+    stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8', newline='')
+    try:
+        if fmt == 'csv':
+            for row in csv.DictReader(stream):
+                yield row
+        else:
+            for line_no, line in enumerate(stream, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield {'_error': f"line {line_no}: invalid JSON ({e})"}
+                    continue
+                if isinstance(record, dict):
+                    yield record
+                else:
+                    yield {'_error': f"line {line_no}: expected a JSON object"}
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def iter_chunks(records: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _text_field(record: Dict[str, Any], key: str) -> Optional[str]:
+    value = record.get(key)
+    if value is None or value == '':
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def score_chunk(service: MLPredictionService, chunk: List[Dict[str, Any]]) -> List[str]:
+    """Score a chunk, emitting an error line in place for unparsable records or missing text."""
+    for record in chunk:
+        if '_error' not in record and not (_text_field(record, 'text') or '').strip():
+            record['_error'] = 'text is required'
+    
+    valid = [r for r in chunk if '_error' not in r]
+    texts = [_text_field(r, 'text') for r in valid]
+    workloads = [_text_field(r, 'workload') for r in valid]
+    monitors = [_text_field(r, 'monitor') for r in valid]
+    predictions = iter(service.predict_batch(texts, workloads, monitors))
+    
+    lines = []
+    for record in chunk:
+        result = {'error': record['_error']} if '_error' in record else next(predictions)
+        if record.get('id') not in (None, ''):
+            result = {'id': record['id'], **result}
+        lines.append(json.dumps(result, ensure_ascii=False))
+    return lines
+
+
+_WORKER_SERVICE = None
+
+def _init_worker(model_path: str, encoder_path: str) -> None:
+    global _WORKER_SERVICE
+    _WORKER_SERVICE = MLPredictionService(model_path, encoder_path)
+
+def _score_in_worker(chunk: List[Dict[str, Any]]) -> List[str]:
+    return score_chunk(_WORKER_SERVICE, chunk)
+
+
+def run_bulk(input_path: str, output_path: str = '-', fmt: Optional[str] = None,
+             chunk_size: int = 2000, workers: int = 1,
+             model_path: str = 'model.pkl', encoder_path: str = 'label_encoder.pkl') -> Dict[str, Any]:
+    """Score records in chunks and write NDJSON predictions in input order.
+    
+    At most 2 * workers chunks are in flight, so memory stays bounded
+    regardless of input size.
+    """
+    from collections import deque
+    
+    out = sys.stdout if output_path == '-' else open(output_path, 'w', encoding='utf-8')
+    chunks = iter_chunks(read_records(input_path, fmt), chunk_size)
+    total = 0
+    start = time.perf_counter()
+    
+    def write(lines):
+        out.write('\n'.join(lines) + '\n')
+    
+    try:
+        if workers <= 1:
+            service = MLPredictionService(model_path, encoder_path)
+            for chunk in chunks:
+                write(score_chunk(service, chunk))
+                total += len(chunk)
+        else:
+            import multiprocessing
+            with multiprocessing.Pool(workers, initializer=_init_worker,
+                                      initargs=(model_path, encoder_path)) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append((len(chunk), pool.apply_async(_score_in_worker, (chunk,))))
+                    if len(pending) >= 2 * workers:
+                        size, job = pending.popleft()
+                        write(job.get())
+                        total += size
+                while pending:
+                    size, job = pending.popleft()
+                    write(job.get())
+                    total += size
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    
+    elapsed = time.perf_counter() - start
+    return {
+        'records': total,
+        'seconds': round(elapsed, 2),
+        'recordsPerSecond': round(total / elapsed, 1) if elapsed > 0 else 0,
+        'workers': workers,
+    }
+
+
 def main():
     parser = argparse.ArgumentParser(description='ML Prediction Service')
     parser.add_argument('--text', type=str, help='Incident text')
@@ -98,8 +374,22 @@ def main():
     parser.add_argument('--monitor', type=str, help='Monitor name')
     parser.add_argument('--json', action='store_true', help='Output as JSON')
     parser.add_argument('--serve', action='store_true', help='Run as HTTP server')
+    parser.add_argument('--port', type=int, default=5000, help='HTTP server port')
+    parser.add_argument('--watch', type=float, metavar='SECONDS', help='Reload the model when its artifacts change, polling every SECONDS')
+    parser.add_argument('--bulk', type=str, metavar='FILE', help="Score NDJSON/CSV records from FILE ('-' for stdin)")
+    parser.add_argument('--format', choices=['ndjson', 'csv'], help='Bulk input format (default: by file extension)')
+    parser.add_argument('--output', type=str, default='-', help='Bulk NDJSON output file (default: stdout)')
+    parser.add_argument('--chunk-size', type=int, default=2000, help='Records scored per vectorized batch')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes for bulk scoring')
     
     args = parser.parse_args()
+    
+    if args.bulk:
+        stats = run_bulk(args.bulk, args.output, args.format, args.chunk_size, args.workers)
+        print(f"✓ Scored {stats['records']} records in {stats['seconds']}s "
+              f"({stats['recordsPerSecond']} records/s, {stats['workers']} workers)", file=sys.stderr)
+        return
+    
     service = MLPredictionService()
     
     if args.serve:
@@ -113,7 +403,32 @@ def main():
                 result = service.predict(data.get('text', ''), data.get('workload'), data.get('monitor'))
                 return jsonify(result)
             
-            app.run(host='0.0.0.0', port=5000)
+            def admin_allowed() -> bool:
+                # Admin routes need ML_ADMIN_TOKEN when it is set, otherwise a loopback client
+                token = os.environ.get('ML_ADMIN_TOKEN')
+                if token:
+                    return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token)
+                return request.remote_addr in ('127.0.0.1', '::1')
+            
+            @app.route('/admin/model', methods=['GET'])
+            def model_status():
+                if not admin_allowed():
+                    return jsonify({'error': 'Forbidden'}), 403
+                return jsonify(service.status())
+            
+            @app.route('/admin/reload', methods=['POST'])
+            def reload_model():
+                if not admin_allowed():
+                    return jsonify({'error': 'Forbidden'}), 403
+                scheduled = service.reload_in_background()
+                return jsonify({'scheduled': scheduled, **service.status()}), 202
+            
+            if hasattr(signal, 'SIGHUP'):
+                signal.signal(signal.SIGHUP, lambda signum, frame: service.reload_in_background())
+            if args.watch:
+                service.watch_artifacts(args.watch)
+            
+            app.run(host='0.0.0.0', port=args.port)
         except ImportError:
             print("Error: Flask not installed", file=sys.stderr)
             sys.exit(1)